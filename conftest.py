@@ -0,0 +1,2 @@
+# Placed at the repository root so that pytest puts the root on sys.path and
+# the exo_transit_tracker package can be imported by the tests.
@@ -1,3 +1,4 @@
-from . import *
+from exo_transit_tracker.exo_transit_tracker import next_transit
+from exo_transit_tracker.exoplanet import Exoplanet, resolve_many
 
 __version__ = 1.0
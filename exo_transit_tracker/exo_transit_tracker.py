@@ -1,13 +1,24 @@
+import functools
 import numpy as np
+import pandas as pd
 import astropy
 import astropy.units as u
-from astropy.coordinates import EarthLocation
+from astropy.coordinates import EarthLocation, SkyCoord
 import warnings
 
 from exo_transit_tracker.exoplanet import Exoplanet
 from exo_transit_tracker.utils import query_nea
 from exo_transit_tracker.visibility import calc_vis
 
+@functools.lru_cache(maxsize=32)
+def _earthloc(lon, lat, h):
+    """
+        Build (and cache) the EarthLocation for a longitude and latitude (in
+        degrees) and elevation (in meters).
+    """
+    
+    return EarthLocation.from_geodetic(lon * u.deg, lat * u.deg, height=h * u.m)
+
 def next_transit(st_name, pl_id, source='NEA', P=None, T0=None, loc=None):
     """
         Determine the timing of the next transit of a given exoplanet.
@@ -68,7 +79,11 @@ def next_transit(st_name, pl_id, source='NEA', P=None, T0=None, loc=None):
             msg += 'longitude, latitude, and elevation.'
             raise ValueError(msg)
         try:
-            loc = EarthLocation.from_geodetic(loc[0], loc[1], height=loc[2])
+            # Accept plain numbers or astropy Quantities
+            lon = u.Quantity(loc[0], u.deg).to_value(u.deg)
+            lat = u.Quantity(loc[1], u.deg).to_value(u.deg)
+            h = u.Quantity(loc[2], u.m).to_value(u.m)
+            loc = _earthloc(round(lon, 6), round(lat, 6), round(h, 2))
         except Exception as ee:
             print(ee)
             
@@ -112,80 +127,67 @@ def next_transit(st_name, pl_id, source='NEA', P=None, T0=None, loc=None):
         xo.get_radec_simbad()
         xo.simbad_known = True
         
-        # Query the NEA for all exoplanet RA/Dec
-        qryCols = 'pl_name,ra,dec'
-        qryTab = 'ps'
-        qryConst = {'col': ['default_flag'],
-                    'oper': ['='],
-                    'val': ['1']}
-        df_coords = query_nea(col=qryCols, tab=qryTab, const=qryConst)
+        # Query the NEA for all entries near the target system's RA/Dec
+        qryADQL = 'select hostname,pl_letter,ra,dec,default_flag,tran_flag,'
+        qryADQL += 'pl_orbper,pl_tranmid from ps where '
+        qryADQL += "CONTAINS(POINT('ICRS',ra,dec),"
+        qryADQL += "CIRCLE('ICRS',{},{},{}))=1".format(xo.ra_deg, xo.dec_deg,
+                                                       0.05)
+        df_pl = query_nea(raw_adql=qryADQL)
+        if len(df_pl) == 0:
+            print('Could not find {} on the NEA. '.format(xo.st_name) +
+                  'No transits can be reported.')
+            return
                             
         # Cross match with the target system's RA/Dec
-        df_coords['dist'] = np.sqrt((df_coords.ra - xo.ra_deg) ** 2 +
-                                    (df_coords.dec - xo.dec_deg) ** 2)
-        matchInd = df_coords.where(df_coords.dist ==
-                                   min(df_coords.dist))['dist'].dropna().index
-        matchName = df_coords.loc[matchInd, 'pl_name'].values[0]
-        if xo.st_name not in matchName:
+        nea_coords = SkyCoord(df_pl['ra'].values, df_pl['dec'].values,
+                              unit=u.deg)
+        matchInd = int(xo.st_coords.separation(nea_coords).argmin())
+        matchHost = df_pl['hostname'].values[matchInd]
+        matchName = '{} {}'.format(matchHost, xo.pl_id)
+        if xo.st_name not in matchHost:
             msg = 'Matched {} on'.format(xo.st_name)
-            msg += ' the NEA to {}. '.format(matchName)
+            msg += ' the NEA to {}. '.format(matchHost)
             msg += 'Assuming alias and proceeding.'
             warnings.warn(msg)
         
-        # Gather all the ephemerides for this planet from the
-        # NEA with another query. 
-        qryCols = 'pl_name,default_flag,tran_flag,pl_orbper,pl_tranmid'
-        qyrTab = 'ps'
-        df_pl = query_nea(col=qryCols, tab=qryTab)
-        
         # Trim other planets
-        df_pl = df_pl.loc[df_pl.where(df_pl['pl_name'] == 
-                                      matchName)['pl_name'].dropna().index]
-        
+        df_pl = df_pl.loc[(df_pl['hostname'].values == matchHost) &
+                          (df_pl['pl_letter'].values == xo.pl_id)]
+        if len(df_pl) == 0:
+            print('Could not find {} on the NEA. '.format(matchName) +
+                  'No transits can be reported.')
+            return
         
         # Evaluate the results and pick an ephemeris
-        df_sub = df_pl.loc[df_pl.where(df_pl['tran_flag'] == 
-                                       1)['tran_flag'].dropna().index]
-        if len(df_sub) == 0:
+        df_pl = df_pl.loc[df_pl['tran_flag'].values == 1]
+        if len(df_pl) == 0:
             print('According to the NEA, {} does not transit. '.format(xo.pl_name))
             print('If you have discovered a transit of this planet, '
                   'please consult your nearest observatory immediately.')
             return 
         xo.shows_transits = True
         
-        # Check the default entry
-        df_default = df_pl.loc[df_pl.where(df_pl['default_flag'] == 
-                                       1)['default_flag'].dropna().index]
-        if df_default['pl_orbper'].values[0] is not None and \
-            df_default['pl_tranmid'].values[0] is not None:
-                xo.P = df_default['pl_orbper'].values[0]
-                xo.T0 = df_default['pl_tranmid'].values[0]
+        # Pick an ephemeris: the default entry if it gives both P and T0, 
+        # otherwise the first entry that does, otherwise combine entries
+        df_pl = df_pl.sort_values('default_flag', ascending=False, kind='stable')
+        p = df_pl['pl_orbper'].to_numpy()
+        t = df_pl['pl_tranmid'].to_numpy()
+        has_P, has_T0 = pd.notna(p), pd.notna(t)
+        both = has_P & has_T0
+        if both.any():
+            idx = both.argmax()
+            xo.P, xo.T0 = p[idx], t[idx]
         else:
-            # Use an entry that gives both P and T0 or use multiple entries
-            df_other = df_pl.loc[df_pl.where(df_pl['default_flag'] == 
-                                       0)['default_flag'].dropna().index]
-            df_other['full_ephem'] = [False] * len(df_other)
-            final_P, final_T0 = None, None
-            for i in df_other.index:
-                if df_other.loc[i, 'pl_orbper'] is not None and \
-                    df_other.loc[i, 'pl_tranmid'] is not None:
-                        xo.P = df_other.loc[i, 'pl_orbper']
-                        xo.T0 = df_other.loc[i, 'pl_tranmid']
-                        break
-                else:
-                    if df_other.loc[i, 'pl_orbper'] is not None and final_P is None:
-                        final_P = df_other.loc[i, 'pl_orbper']
-                    if df_other.loc[i, 'pl_tranmid'] is not None and final_T0 is None:
-                        final_T0 = df_other.loc[i, 'pl_tranmid']
-            
-            if xo.P is None and final_P is not None:
-                xo.P = final_P
-            if xo.T0 is None and final_T0 is not None:
-                xo.T0 = final_T0
-            if np.any([xo.P is None, xo.T0 is None]):
-                print('Could not extract a complete ephemeris from the NEA.'
-                      ' No transits can be reported.')
-                return
+            final_P, final_T0 = p[has_P][:1], t[has_T0][:1]
+            if len(final_P) > 0:
+                xo.P = final_P[0]
+            if len(final_T0) > 0:
+                xo.T0 = final_T0[0]
+        if np.any([xo.P is None, xo.T0 is None]):
+            print('Could not extract a complete ephemeris from the NEA.'
+                  ' No transits can be reported.')
+            return
                                 
         # Calculate the next transit from now
         xo.ephemeris_to_next_transit()
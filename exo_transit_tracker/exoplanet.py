@@ -16,18 +16,78 @@ import warnings
 #
 ##################################################
 
+# Simbad coordinates resolved so far, keyed by the name sent to Simbad. Each
+# value is a tuple of (RA string, Dec string, SkyCoord).
+_SIMBAD_CACHE = {}
+
+# Simbad instance used for batch queries, created on first use and kept so
+# that its HTTP session is reused across calls
+_SIMBAD_BATCH = None
+
+def _parse_simbad_radec(ra, dec):
+    """
+        Convert the space-separated sexagesimal RA/Dec returned by Simbad
+        into the (RA string, Dec string, SkyCoord) tuple stored in the cache.
+    """
+    
+    ra = ':'.join(ra.split())
+    dec = ':'.join(dec.split())
+    
+    return ra, dec, SkyCoord(ra, dec, unit=[u.hourangle, u.deg])
+
+def _future_epochs(T0, P, jd_now, K):
+    """
+        Compute the mid-times (as BJDs) of the next K transits after jd_now
+        for the ephemeris (T0, P).
+    """
+    
+    e0 = np.floor((jd_now - T0) / P) + 1
+    
+    return T0 + P * (e0 + np.arange(K))
+
+def resolve_many(names):
+    """
+        Query the CDS Simbad database for the coordinates of many stars in a
+        single request. The results are cached so that subsequent calls to
+        Exoplanet.get_radec_simbad for these stars do not query Simbad.
+        
+        Inputs
+        ------
+        
+            names: list of str
+                Names of the host stars.
+                
+        Outputs
+        -------
+        
+            coords: dict
+                SkyCoord of each star that Simbad could resolve, keyed by
+                name.
+    """
+    
+    global _SIMBAD_BATCH
+    
+    missing = list(set(names) - set(_SIMBAD_CACHE))
+    if len(missing) > 0:
+        if _SIMBAD_BATCH is None:
+            _SIMBAD_BATCH = Simbad()
+            _SIMBAD_BATCH.add_votable_fields('typed_id')
+        res = _SIMBAD_BATCH.query_objects(missing)
+        if res is not None:
+            for row in res:
+                if np.ma.is_masked(row['RA']) or len(row['RA'].strip()) == 0:
+                    continue
+                _SIMBAD_CACHE[str(row['TYPED_ID'])] = \
+                    _parse_simbad_radec(row['RA'], row['DEC'])
+    
+    return {name: _SIMBAD_CACHE[name][2] for name in names
+            if name in _SIMBAD_CACHE}
+
 class Exoplanet():
     
-    shows_transits = False
-    simbad_known = False
-    ra_deg = None
-    dec_deg = None
-    ra = None
-    dec = None
-    st_coords = None
-    P = None
-    T0 = None
-    next_transit = None
+    __slots__ = ('st_name', 'pl_id', 'pl_name', 'shows_transits',
+                 'simbad_known', 'ra', 'dec', 'ra_deg', 'dec_deg',
+                 'st_coords', 'P', 'T0', 'next_transit')
     
     def __init__(self, st_name, pl_id, **kwargs):
         """
@@ -46,6 +106,16 @@ class Exoplanet():
         self.st_name = st_name
         self.pl_id = pl_id
         self.pl_name = '{} {}'.format(st_name, pl_id)
+        self.shows_transits = False
+        self.simbad_known = False
+        self.ra = None
+        self.dec = None
+        self.ra_deg = None
+        self.dec_deg = None
+        self.st_coords = None
+        self.P = None
+        self.T0 = None
+        self.next_transit = None
     
         # Define attributes with kwargs
         for key, val in kwargs.items():
@@ -55,22 +125,24 @@ class Exoplanet():
         """
             Query the CDS Simbad database for coordinates. Star
             must be recognized by Simbad in order for RA/Dec to 
-            be found. 
+            be found. Stars already resolved (e.g., with
+            resolve_many) are taken from the cache without a query.
         """
     
-        res = Simbad.query_object(self.st_name)
-        if res is None:
-            raise Exception('The name {} cannot '.format(self.st_name) + \
-                            'be matched to a known ojbect in Simbad.')
+        if self.st_name not in _SIMBAD_CACHE:
+            res = Simbad.query_object(self.st_name)
+            if res is None:
+                raise Exception('The name {} cannot '.format(self.st_name) + \
+                                'be matched to a known ojbect in Simbad.')
+            _SIMBAD_CACHE[self.st_name] = _parse_simbad_radec(res['RA'][0],
+                                                              res['DEC'][0])
     
         # Store RA and Dec in useful units
-        self.ra = ':'.join(res['RA'][0].split())
-        self.dec = ':'.join(res['DEC'][0].split())
-        self.st_coords = SkyCoord(self.ra, self.dec, unit=[u.hourangle, u.deg])
+        self.ra, self.dec, self.st_coords = _SIMBAD_CACHE[self.st_name]
         self.ra_deg = self.st_coords.ra.value
         self.dec_deg = self.st_coords.dec.value
             
-    def ephemeris_to_next_transit(self, t=None):
+    def ephemeris_to_next_transit(self, t=None, t_jd=None):
         """
             Calculate the timing of the next transit using the Exoplanet objects's 
             ephemeris. 
@@ -81,6 +153,10 @@ class Exoplanet():
                 t: None or time
                     The reference time for calculating the "next" transit. If None,
                     the current time will be used.
+                    
+                t_jd: None or float
+                    The reference time as a Barycentric Julian Day. If given, it
+                    takes precedence over t and no Time object is built for it.
             
             Outputs
             -------
@@ -91,21 +167,20 @@ class Exoplanet():
         if self.P is None or self.T0 is None:
             raise ValueError('Ephermis is not defined.')
         
-        # Get current time or evaluate passed time
-        if t is not None:
-            try:
-                t = Time(t)
-            except:
-                warnings.warn('Cannot understand {} as a time.'.format(t) + \
-                              ' Using the present time instead.')
+        # Get current time or evaluate passed time as a BJD
+        if t_jd is None:
+            if t is not None:
+                try:
+                    t = Time(t)
+                except:
+                    warnings.warn('Cannot understand {} as a time.'.format(t) + \
+                                  ' Using the present time instead.')
+                    t = Time.now()
+            else:
                 t = Time.now()
-        else:
-            t = Time.now()
+            t_jd = t.tdb.jd
             
         # Determine next transit time
-        t0 = Time(self.T0, format='jd', scale='tdb')
-        epoch = (t - t0).jd // self.P + 1
-    
-        self.next_transit =  Time(self.T0 + self.P * epoch,
+        self.next_transit =  Time(_future_epochs(self.T0, self.P, t_jd, 1)[0],
                                   format='jd',
-                                  scale='tdb')
\ No newline at end of file
+                                  scale='tdb')
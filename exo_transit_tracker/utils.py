@@ -1,6 +1,37 @@
+import hashlib
+import io
+import json
+import os
+import tempfile
+import time
+import warnings
 import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlencode
+from urllib3.util.retry import Retry
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:
+    pa = None
+
+# Location and lifetime (in seconds) of the on-disk cache of NEA queries
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'exo_transit_tracker')
+CACHE_TTL = 24 * 3600
+
+# Persistent HTTP session shared by all NEA queries. Connections are kept
+# alive between queries and transient server errors are retried.
+_SESSION = requests.Session()
+_SESSION.headers.update({'Accept-Encoding': 'gzip',
+                         'User-Agent': 'ExoTransitTracker/1.0'})
+_SESSION.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=8,
+                                       max_retries=Retry(total=3,
+                                                         backoff_factor=0.5,
+                                                         status_forcelist=[502, 503, 504])))
     
-def query_nea(col='*', fmt='csv', tab='ps', const=None):
+def query_nea(col='*', fmt='csv', tab='ps', const=None, cone=None,
+              raw_adql=None, cache=True, ttl=CACHE_TTL):
     """
         Query the NEA database with the TAP protocol.
         
@@ -27,6 +58,24 @@ def query_nea(col='*', fmt='csv', tab='ps', const=None):
                 where 'col' is the column to constrain, 'oper' is the relational
                 operator, and 'val' is the criterion. Default=None.
                 
+            cone: tuple
+                A tuple containing the RA (in degrees), Dec (in degrees), and
+                radius (in degrees) of a cone to which the query is restricted
+                on the server side. Default=None.
+                
+            raw_adql: str
+                A complete ADQL query to send to the NEA. If given, col, tab,
+                const, and cone are ignored. Default=None.
+                
+            cache: bool
+                Whether to read and write the on-disk cache of query results
+                in CACHE_DIR. Default=True.
+                
+            ttl: float
+                Age (in seconds) below which a cached result is used without
+                contacting the NEA. Older results are revalidated with the
+                server. Default=CACHE_TTL (24 hours).
+                
         Outputs
         -------
         
@@ -36,17 +85,121 @@ def query_nea(col='*', fmt='csv', tab='ps', const=None):
     """
     
     # Construct the url
-    url = construct_nea_url(col, fmt, tab, const=const)
+    url = construct_nea_url(col, fmt, tab, const=const, cone=cone,
+                            raw_adql=raw_adql)
+    
+    # Use the cached result if it is recent enough
+    key = hashlib.blake2b(url.encode()).hexdigest()
+    df_path = os.path.join(CACHE_DIR, key + '.pkl')
+    meta_path = os.path.join(CACHE_DIR, key + '.json')
+    df_cached = _read_cache(df_path) if cache else None
+    cached = df_cached is not None
+    if cached and time.time() - os.path.getmtime(df_path) < ttl:
+        return df_cached
+    
+    # Otherwise ask the NEA, revalidating the cached result if there is one
+    headers = {}
+    if cached and os.path.exists(meta_path):
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            meta = {}
+        if meta.get('etag') is not None:
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified') is not None:
+            headers['If-Modified-Since'] = meta['last_modified']
     
     try:
-        df = pd.read_csv(url)
+        r = _SESSION.get(url, headers=headers, timeout=60)
+        r.raise_for_status()
     except Exception as ee:
         print(ee)
         print('The URL sent was: {}'.format(url))
+        if cached:
+            warnings.warn('Could not reach the NEA. Using the cached result '
+                          'of this query instead.')
+            return df_cached
+        raise
+    
+    if cached and r.status_code == 304:
+        os.utime(df_path)
+        return df_cached
+    
+    df = parse_csv(r.content)
+    
+    if cache:
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            
+            _write_atomic(df_path, 'wb', df.to_pickle)
+            meta = {'url': url,
+                    'etag': r.headers.get('ETag'),
+                    'last_modified': r.headers.get('Last-Modified')}
+            _write_atomic(meta_path, 'w', lambda f: json.dump(meta, f))
+        except Exception as ee:
+            warnings.warn('Could not cache the NEA query: {}'.format(ee))
         
     return df
 
-def construct_nea_url(col, fmt, tab, const=None):
+def _write_atomic(path, mode, write):
+    """
+        Write a cache file by calling write on a temporary file in the same
+        directory and then moving it into place, so that an interrupted write
+        never leaves a partial cache entry behind. The temporary file is
+        removed if the write fails.
+    """
+    
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode) as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def _read_cache(df_path):
+    """
+        Read a cached query result. Returns None if there is no cache entry
+        or if it cannot be read (e.g., a truncated file or a pickle written
+        by an incompatible pandas version), so that it is treated as a miss.
+    """
+    
+    if not os.path.exists(df_path):
+        return None
+    
+    try:
+        return pd.read_pickle(df_path)
+    except Exception as ee:
+        warnings.warn('Ignoring unreadable NEA cache entry {}: {}'.format(df_path,
+                                                                        ee))
+        return None
+
+def parse_csv(content):
+    """
+        Parse the CSV returned by the NEA into a DataFrame, using the
+        multithreaded pyarrow CSV reader when pyarrow is installed.
+        
+        Inputs
+        ------
+        
+            content: bytes
+                Body of the NEA response.
+                
+        Outputs
+        -------
+        
+            df: pandas.DataFrame
+                Object containing the parsed table.
+    """
+    
+    if pa is None:
+        return pd.read_csv(io.BytesIO(content))
+    
+    return pacsv.read_csv(pa.BufferReader(content)).to_pandas()
+
+def construct_nea_url(col, fmt, tab, const=None, cone=None, raw_adql=None):
     """
         Construct the URL for the call to the NEA database.
         
@@ -73,6 +226,15 @@ def construct_nea_url(col, fmt, tab, const=None):
                 where 'col' is the column to constrain, 'oper' is the relational
                 operator, and 'val' is the criterion. Default=None.
                 
+            cone: tuple
+                A tuple containing the RA (in degrees), Dec (in degrees), and
+                radius (in degrees) of a cone to which the query is restricted
+                via an ADQL CONTAINS clause. Default=None.
+                
+            raw_adql: str
+                A complete ADQL query to be encoded into the URL. If given,
+                col, tab, const, and cone are ignored. Default=None.
+                
         Outputs
         -------
         
@@ -80,18 +242,20 @@ def construct_nea_url(col, fmt, tab, const=None):
                 Concatenated URL.
     """
     
-    base_url = 'https://exoplanetarchive.ipac.caltech.edu/TAP/sync?query=select+'
-    url = base_url + col
-    url += '+from+'
-    url += tab
-    if const is not None:
-        url += '+where+'
-        for i in range(len(const['col'])):
-            url += const['col'][i] + '+'
-            url += const['oper'][i] + '+'
-            url += const['val'][i]
-            if i < (len(const['col']) - 1):
-                url += '+and+'
-    url += '&format={}'.format(fmt)
+    base_url = 'https://exoplanetarchive.ipac.caltech.edu/TAP/sync?'
+    if raw_adql is not None:
+        query = raw_adql
+    else:
+        query = 'select {} from {}'.format(col, tab)
+        where = []
+        if const is not None:
+            where += ['{} {} {}'.format(c, o, v) for c, o, v in
+                      zip(const['col'], const['oper'], const['val'])]
+        if cone is not None:
+            where.append("CONTAINS(POINT('ICRS',ra,dec),"
+                         "CIRCLE('ICRS',{},{},{}))=1".format(*cone))
+        if len(where) > 0:
+            query += ' where ' + ' and '.join(where)
+    url = base_url + urlencode({'query': query, 'format': fmt})
 
-    return url
\ No newline at end of file
+    return url
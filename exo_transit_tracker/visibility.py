@@ -1,9 +1,47 @@
+import functools
+import numpy as np
 from astropy.time import Time
 import astropy.units as u
 from astropy.coordinates import SkyCoord, EarthLocation
 import astroplan as ap
 import warnings
 
+from exo_transit_tracker.exoplanet import _future_epochs
+
+@functools.lru_cache(maxsize=64)
+def _make_constraints(night, altMin, moonSep):
+    """
+        Build the list of astroplan constraints. The result is cached so
+        repeated calls with the same constraints reuse the same objects.
+        
+        Inputs
+        ------
+        
+            night, altMin, moonSep:
+                As in calc_vis.
+                
+        Outputs
+        -------
+        
+            Constraints: tuple of astroplan constraints
+    """
+    
+    # Build astroplan constraints list
+    Constraints = []
+    if night == 'sunset':
+        Constraints.append(ap.AtNightConstraint(max_solar_altitude = 0 * u.deg))
+    elif night == 'civil':
+        Constraints.append(ap.AtNightConstraint.twilight_civil())
+    elif night == 'nautical':
+        Constraints.append(ap.AtNightConstraint.twilight_nautical())
+    else:
+        Constraints.append(ap.AtNightConstraint.twilight_astronomical())
+    
+    Constraints.append(ap.AltitudeConstraint(min=altMin * u.deg))
+    Constraints.append(ap.MoonSeparationConstraint(min=moonSep * u.deg))
+    
+    return tuple(Constraints)
+
 def calc_vis(xo, loc, night='nautical', altMin=15, moonSep=30):
     """
         Calculate the visibility of the host star from the given site and a
@@ -61,20 +99,10 @@ def calc_vis(xo, loc, night='nautical', altMin=15, moonSep=30):
         warnings.warn(msg)
         xo.ephemeris_to_next_transit()
         
-    # Build astroplan constraints list
-    Constraints = []
-    if night == 'sunset':
-        Constraints.append(ap.AtNightConstraint(max_solar_altitude = 0 * u.deg))
-    elif night == 'civil':
-        Constraints.append(ap.AtNightConstraint.twilight_civil())
-    elif night == 'nautical':
-        Constraints.append(ap.AtNightConstraint.twilight_nautical())
-    else:
-        Constraints.append(ap.AtNightConstraint.twilight_astronomical())
-    
-    Constraints.append(ap.AltitudeConstraint(min=altMin * u.deg))
-    Constraints.append(ap.MoonSeparationConstraint(min=moonSep * u.deg))
-    
+    # Get the (cached) astroplan constraints. The Observer is built fresh for
+    # each call since astroplan caches alt/az results on it, which would
+    # otherwise accumulate for every target evaluated from this site
+    Constraints = _make_constraints(night.lower(), altMin, moonSep)
     Observer = ap.Observer(location=loc, name='Observer')
     
     # First check if this source is ever observable from this location
@@ -84,25 +112,32 @@ def calc_vis(xo, loc, night='nautical', altMin=15, moonSep=30):
     if not ever_observable:
         return False
     
-    # Continue to determine the next observable transit. Start by checking the 
-    # transit time already determined for the Exoplanet object
-    vis = ap.is_observable(Constraints, Observer, xo.st_coords,
-                           times=xo.next_transit)[0]
-
-    if vis:
-        return True
-        
-    while not vis:
-        xo.ephemeris_to_next_transit(t=xo.next_transit + 1 * u.hour)
+    # Continue to determine the next observable transit. Evaluate the 
+    # constraints over a batch of upcoming transit times at once, starting with
+    # the transit time already determined for the Exoplanet object, and double
+    # the batch (up to 10,000 transits) until a visible transit is found
+    jd_start = xo.next_transit.tdb.jd - 1 / 24
+    n_epochs = 200
+    while True:
+        jds = _future_epochs(xo.T0, xo.P, jd_start, n_epochs)
+        times = Time(jds, format='jd', scale='tdb')
         with warnings.catch_warnings():
             warnings.simplefilter("ignore")
-            vis = ap.is_observable(Constraints, Observer, xo.st_coords,
-                                   times=xo.next_transit)[0]
+            vis = np.logical_and.reduce([constraint(Observer, xo.st_coords,
+                                                    times=times,
+                                                    grid_times_targets=True)
+                                         for constraint in Constraints])
+        vis = np.ravel(vis)
+        
+        if vis.any():
+            xo.next_transit = times[np.argmax(vis)]
+            return True
         
         # Rip-cord for this while loop
-        if xo.next_transit.byear > 10000:
+        if times[-1].byear > 10000:
             msg = 'No visibility found up to the year 10,000 (!!).'
             msg += ' Stopping analysis here.'
             raise RuntimeError(msg)
-    
-    return True
\ No newline at end of file
+        
+        jd_start = jds[-1] + 1 / 24
+        n_epochs = min(2 * n_epochs, 10000)
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('astroquery')
+pytest.importorskip('astroplan')
+
+import astropy.units as u
+from astropy.coordinates import SkyCoord
+from astropy.table import MaskedColumn, Table
+
+from exo_transit_tracker import exoplanet
+from exo_transit_tracker.exoplanet import Exoplanet, resolve_many
+
+KEPLER51 = SkyCoord('19:45:55.14', '+49:56:15.6', unit=[u.hourangle, u.deg])
+
+def make_table():
+    # Rows come back in a different order than the names were sent, one name
+    # is unresolved (masked) and one has blank coordinates
+    return Table({'TYPED_ID': ['Nope', 'Kepler-51', 'Blank'],
+                  'RA': MaskedColumn(['', '19 45 55.14', ' '],
+                                     mask=[True, False, False]),
+                  'DEC': MaskedColumn(['', '+49 56 15.6', ' '],
+                                      mask=[True, False, False])})
+
+@pytest.fixture
+def simbad(monkeypatch):
+    calls = []
+
+    class FakeSimbad():
+
+        def __init__(self):
+            self.fields = []
+
+        def add_votable_fields(self, *fields):
+            self.fields += fields
+
+        def query_objects(self, names):
+            assert 'typed_id' in self.fields
+            calls.append(sorted(names))
+            return make_table()
+
+        @staticmethod
+        def query_object(name):
+            raise AssertionError('Unexpected Simbad query for {}'.format(name))
+
+    monkeypatch.setattr(exoplanet, 'Simbad', FakeSimbad)
+    monkeypatch.setattr(exoplanet, '_SIMBAD_CACHE', {})
+    monkeypatch.setattr(exoplanet, '_SIMBAD_BATCH', None)
+    return calls
+
+def test_resolve_many_keys_by_typed_id(simbad):
+    coords = resolve_many(['Blank', 'Kepler-51', 'Nope', 'Kepler-51'])
+
+    assert simbad == [['Blank', 'Kepler-51', 'Nope']]
+    assert set(coords) == {'Kepler-51'}
+    assert coords['Kepler-51'].separation(KEPLER51) < 1 * u.arcsec
+
+def test_resolve_many_skips_unresolved_rows(simbad):
+    resolve_many(['Blank', 'Kepler-51', 'Nope'])
+
+    assert set(exoplanet._SIMBAD_CACHE) == {'Kepler-51'}
+
+def test_resolve_many_only_queries_missing_names(simbad):
+    resolve_many(['Kepler-51'])
+    resolve_many(['Kepler-51'])
+
+    assert len(simbad) == 1
+
+def test_get_radec_simbad_uses_batch_cache(simbad):
+    resolve_many(['Kepler-51'])
+
+    xo = Exoplanet('Kepler-51', 'b')
+    xo.get_radec_simbad()
+
+    assert len(simbad) == 1
+    assert xo.ra == '19:45:55.14'
+    assert xo.dec == '+49:56:15.6'
+    assert np.isclose(xo.ra_deg, KEPLER51.ra.deg)
+    assert np.isclose(xo.dec_deg, KEPLER51.dec.deg)
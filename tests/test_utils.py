@@ -0,0 +1,151 @@
+import pytest
+from urllib.parse import parse_qs
+
+pd = pytest.importorskip('pandas')
+requests = pytest.importorskip('requests')
+# Importing the package pulls in the astronomy dependencies
+pytest.importorskip('astroplan')
+pytest.importorskip('astroquery')
+
+from exo_transit_tracker import utils
+
+CSV = b'pl_name,pl_orbper\nTest b,3.0\n'
+
+class FakeResponse():
+
+    def __init__(self, status_code=200, content=b'', headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(str(self.status_code))
+
+class FakeSession():
+
+    def __init__(self):
+        self.responses = []
+        self.calls = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.calls.append(dict(headers or {}))
+        r = self.responses.pop(0)
+        if isinstance(r, Exception):
+            raise r
+        return r
+
+@pytest.fixture
+def session(monkeypatch, tmp_path):
+    monkeypatch.setattr(utils, 'CACHE_DIR', str(tmp_path / 'cache'))
+    fake = FakeSession()
+    monkeypatch.setattr(utils, '_SESSION', fake)
+    return fake
+
+def query():
+    return utils.query_nea(col='pl_name,pl_orbper', tab='ps')
+
+def test_fresh_cache_hit_skips_request(session):
+    session.responses = [FakeResponse(content=CSV, headers={'ETag': 'abc'})]
+    df1 = query()
+    df2 = query()
+
+    assert len(session.calls) == 1
+    pd.testing.assert_frame_equal(df1, df2)
+    assert df2['pl_name'].values[0] == 'Test b'
+
+def test_stale_cache_revalidated_with_304(session):
+    session.responses = [FakeResponse(content=CSV, headers={'ETag': 'abc'}),
+                         FakeResponse(status_code=304)]
+    df1 = query()
+    df2 = utils.query_nea(col='pl_name,pl_orbper', tab='ps', ttl=0)
+
+    assert len(session.calls) == 2
+    assert session.calls[1]['If-None-Match'] == 'abc'
+    pd.testing.assert_frame_equal(df1, df2)
+
+def test_unreadable_cache_is_a_miss(session, tmp_path):
+    session.responses = [FakeResponse(content=CSV, headers={'ETag': 'abc'}),
+                         FakeResponse(content=CSV, headers={'ETag': 'abc'})]
+    query()
+    pkl, = (tmp_path / 'cache').glob('*.pkl')
+    pkl.write_bytes(b'not a pickle')
+
+    with pytest.warns(UserWarning, match='unreadable'):
+        df = query()
+
+    assert len(session.calls) == 2
+    assert 'If-None-Match' not in session.calls[1]
+    assert df['pl_name'].values[0] == 'Test b'
+
+def test_stale_cache_used_when_request_fails(session):
+    session.responses = [FakeResponse(content=CSV),
+                         requests.ConnectionError('offline')]
+    df1 = query()
+
+    with pytest.warns(UserWarning, match='cached result'):
+        df2 = utils.query_nea(col='pl_name,pl_orbper', tab='ps', ttl=0)
+
+    pd.testing.assert_frame_equal(df1, df2)
+
+def test_request_failure_without_cache_raises(session):
+    session.responses = [requests.ConnectionError('offline')]
+
+    with pytest.raises(requests.ConnectionError):
+        query()
+
+def test_failed_cache_write_leaves_no_temporary_files(session, tmp_path,
+                                                      monkeypatch):
+    session.responses = [FakeResponse(content=CSV)]
+
+    def fail(*args, **kwargs):
+        raise OSError('disk full')
+    monkeypatch.setattr(pd.DataFrame, 'to_pickle', fail)
+
+    with pytest.warns(UserWarning, match='Could not cache'):
+        df = query()
+
+    assert df['pl_name'].values[0] == 'Test b'
+    assert list((tmp_path / 'cache').glob('*.tmp')) == []
+
+def parse_url(url):
+    base, _, qs = url.partition('?')
+    assert base == 'https://exoplanetarchive.ipac.caltech.edu/TAP/sync'
+    params = parse_qs(qs, keep_blank_values=True)
+    return params['query'][0], params['format'][0]
+
+CONST = {'col': ['default_flag', 'tran_flag'],
+         'oper': ['=', '='],
+         'val': ['1', '1']}
+CONE_ADQL = "CONTAINS(POINT('ICRS',ra,dec),CIRCLE('ICRS',10.5,-20.25,0.05))=1"
+
+def test_url_const_only():
+    url = utils.construct_nea_url('pl_name,ra', 'csv', 'ps', const=CONST)
+    assert parse_url(url) == ('select pl_name,ra from ps where '
+                              'default_flag = 1 and tran_flag = 1', 'csv')
+
+def test_url_cone_only():
+    url = utils.construct_nea_url('pl_name', 'csv', 'ps',
+                                  cone=(10.5, -20.25, 0.05))
+    assert parse_url(url) == ('select pl_name from ps where ' + CONE_ADQL,
+                              'csv')
+
+def test_url_const_and_cone():
+    url = utils.construct_nea_url('pl_name', 'csv', 'ps', const=CONST,
+                                  cone=(10.5, -20.25, 0.05))
+    assert parse_url(url) == ('select pl_name from ps where default_flag = 1 '
+                              'and tran_flag = 1 and ' + CONE_ADQL, 'csv')
+    # Special characters are escaped rather than passed through
+    assert "'" not in url and '(' not in url and ' ' not in url
+
+def test_url_raw_adql():
+    adql = "select pl_name from ps where hostname = 'Kepler-51'"
+    url = utils.construct_nea_url('ignored', 'votable', 'ignored',
+                                  const=CONST, raw_adql=adql)
+    assert parse_url(url) == (adql, 'votable')
+
+def test_url_is_stable():
+    args = ('pl_name', 'csv', 'ps')
+    kwargs = {'const': CONST, 'cone': (10.5, -20.25, 0.05)}
+    assert utils.construct_nea_url(*args, **kwargs) == \
+        utils.construct_nea_url(*args, **kwargs)
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+ap = pytest.importorskip('astroplan')
+pytest.importorskip('astroquery')
+
+import astropy.units as u
+from astropy.coordinates import EarthLocation, SkyCoord
+from astropy.time import Time
+from astropy.utils import iers
+
+from exo_transit_tracker.exoplanet import Exoplanet
+from exo_transit_tracker.visibility import calc_vis, _make_constraints
+
+# Keep the tests offline
+iers.conf.auto_download = False
+
+# Fixed site (Kitt Peak) and fixed host star / ephemeris
+SITE = (-111.6, 31.96, 2096.)
+T0 = 2459000.5
+P = 3.0
+T_START = 2460000.5
+
+def make_site():
+    return EarthLocation.from_geodetic(SITE[0] * u.deg, SITE[1] * u.deg,
+                                       height=SITE[2] * u.m)
+
+def make_exoplanet():
+    xo = Exoplanet('Test', 'b', P=P, T0=T0)
+    xo.st_coords = SkyCoord(90 * u.deg, 20 * u.deg)
+    xo.ephemeris_to_next_transit(t=Time(T_START, format='jd', scale='tdb'))
+    return xo
+
+def test_make_constraints_is_cached():
+    Constraints = _make_constraints('nautical', 15, 30)
+    assert len(Constraints) == 3
+    assert isinstance(Constraints[0], ap.AtNightConstraint)
+    assert isinstance(Constraints[1], ap.AltitudeConstraint)
+    assert isinstance(Constraints[2], ap.MoonSeparationConstraint)
+    assert _make_constraints('nautical', 15, 30) is Constraints
+
+def first_visible_brute_force(xo, n_epochs=200):
+    """
+        Check the first n_epochs transits from xo.next_transit one at a time
+        and return the JD of the first visible one (or None).
+    """
+    Observer = ap.Observer(location=make_site(), name='Observer')
+    Constraints = _make_constraints('nautical', 15, 30)
+    start = xo.next_transit.tdb.jd
+    for n in range(n_epochs):
+        t = Time(start + P * n, format='jd', scale='tdb')
+        if ap.is_observable(Constraints, Observer, xo.st_coords, times=t)[0]:
+            return t.tdb.jd
+    return None
+
+def test_calc_vis_finds_first_visible_transit():
+    xo = make_exoplanet()
+    expected = first_visible_brute_force(xo)
+    assert expected is not None
+
+    assert calc_vis(xo, make_site())
+    assert np.isclose(xo.next_transit.tdb.jd, expected, rtol=0, atol=1e-6)